@@ -1,12 +1,21 @@
 import mysql.connector
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 import threading
 import time
+from time import perf_counter_ns
 import random
 import logging
+import logging.handlers
 import argparse
 import sys
 import signal
 import os
+import queue
+import atexit
+import itertools
+import math
+import concurrent.futures
 from collections import Counter
 
 # --- Logging Setup ---
@@ -15,6 +24,15 @@ logging.basicConfig(
     format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 )
+# Hand records to a background listener so stream I/O and its lock stay off the worker threads.
+# SimpleQueue.put is reentrant, so logging from the signal handler cannot deadlock on the queue
+log_queue = queue.SimpleQueue()
+root_logger = logging.getLogger()
+log_listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+log_listener.start()
+atexit.register(log_listener.stop) # Flushes pending records on every exit path
+log = logging.getLogger("probe")
 
 # --- Configuration ---
 # Use command-line arguments for flexibility
@@ -35,9 +53,12 @@ parser.add_argument('--database', default=os.getenv('DB_NAME'), help='MySQL data
 parser.add_argument('--create-db', action='store_true', default=str_to_bool(os.getenv('CREATE_DB')), help='Create database if it does not exist')
 parser.add_argument('--workers', type=int, default=int(os.getenv('WORKERS', 5)), help='Number of concurrent worker threads')
 parser.add_argument('--short-query-interval', type=float, default=float(os.getenv('SHORT_QUERY_INTERVAL', 0.5)), help='Seconds between short queries (approx)')
+parser.add_argument('--short-query-batch', type=int, default=int(os.getenv('SHORT_QUERY_BATCH', 1)), help='Number of SELECT 1 probes sent together as one multi-statement round trip')
 parser.add_argument('--long-query-chance', type=float, default=float(os.getenv('LONG_QUERY_CHANCE', 0.1)), help='Probability (0.0 to 1.0) of running a long query instead of a short one')
 parser.add_argument('--long-query-duration', type=int, default=int(os.getenv('LONG_QUERY_DURATION', 10)), help='Duration (seconds) for the simulated long query (SELECT SLEEP)')
 parser.add_argument('--connect-timeout', type=int, default=int(os.getenv('CONNECT_TIMEOUT', 10)), help='Connection timeout in seconds')
+parser.add_argument('--pool-size', type=int, default=int(os.getenv('POOL_SIZE', 0)), help='Number of connections the probe pool keeps open (0 to match the worker count); long queries use a separate pool sized to the expected number of concurrent long queries')
+parser.add_argument('--pool-overflow', type=int, default=int(os.getenv('POOL_OVERFLOW', 0)), help='Extra connections each pool may open beyond --pool-size under load')
 parser.add_argument('--write-ratio', type=float, default=float(os.getenv('WRITE_RATIO', 0.0)), help='Probability (0.0 to 1.0) of running a write query (INSERT/UPDATE/DELETE) instead of a SELECT 1')
 parser.add_argument('--report-interval', type=int, default=int(os.getenv('REPORT_INTERVAL', 30)), help='Seconds between summary reports (0 to disable)')
 
@@ -53,7 +74,7 @@ if missing_args:
 
 # If create_db is specified, try to create the database
 if args.create_db:
-    logging.info(f"Attempting to create database {args.database} if it doesn't exist...")
+    log.info("Attempting to create database %s if it doesn't exist...", args.database)
     temp_connection = None
     try:
         # Connect without database selected
@@ -64,21 +85,126 @@ if args.create_db:
             password=args.password,
             connection_timeout=args.connect_timeout
         )
-        cursor = temp_connection.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {args.database}")
-        cursor.close()
-        logging.info(f"Database {args.database} created successfully or already exists")
+        with temp_connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {args.database}")
+        log.info("Database %s created successfully or already exists", args.database)
     except mysql.connector.Error as err:
-        logging.error(f"Failed to create database: {err}")
+        log.error("Failed to create database: %s", err)
         sys.exit(1)
     finally:
         if temp_connection:
             temp_connection.close()
 
+# Don't oversubscribe a server whose connections are served by a thread pool: run at most thread_pool_size workers.
+# MariaDB and Percona report thread_pool_size even with one-thread-per-connection, so check thread_handling first
+worker_count = args.workers
+temp_connection = None
+try:
+    temp_connection = mysql.connector.connect(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        connection_timeout=args.connect_timeout
+    )
+    with temp_connection.cursor() as cursor:
+        cursor.execute("SHOW VARIABLES WHERE Variable_name IN ('thread_handling', 'thread_pool_size')")
+        server_vars = dict(cursor.fetchall())
+        thread_handling = server_vars.get('thread_handling')
+        if thread_handling == 'loaded-dynamically':
+            # MySQL Enterprise installs its thread pool as a plugin
+            cursor.execute("SELECT COUNT(*) FROM information_schema.PLUGINS WHERE PLUGIN_NAME = 'thread_pool' AND PLUGIN_STATUS = 'ACTIVE'")
+            if cursor.fetchone()[0]:
+                thread_handling = 'pool-of-threads'
+    if thread_handling == 'pool-of-threads' and int(server_vars.get('thread_pool_size', 0)) > 0:
+        worker_count = min(args.workers, int(server_vars['thread_pool_size']))
+except mysql.connector.Error as err:
+    log.warning("Failed to read the server's thread_pool_size, running %s workers: %s", args.workers, err)
+finally:
+    if temp_connection:
+        temp_connection.close()
+if worker_count < args.workers:
+    log.warning("Running %s workers instead of %s to match the server's thread_pool_size", worker_count, args.workers)
+
+
+# --- Connection Pool ---
+# Workers check a connection out of the pool for every query cycle and hand it
+# back afterwards. A session that failed is invalidated and replaced on a later checkout.
+connect_timing = threading.local() # Per-thread time spent opening sessions during the current checkout
+
+def create_probe_connection(read_timeout):
+    start_ns = perf_counter_ns()
+    try:
+        return mysql.connector.connect(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            database=args.database,
+            connection_timeout=args.connect_timeout,
+            # Bound every socket read/write so a peer that vanished during failover surfaces as an error
+            # within seconds instead of after the kernel's TCP retransmission timeout
+            read_timeout=read_timeout,
+            write_timeout=args.connect_timeout,
+            autocommit=True
+        )
+    finally:
+        # The pool opens sessions on the checking-out thread; keep the handshake out of its checkout wait
+        connect_timing.ns = getattr(connect_timing, 'ns', 0) + perf_counter_ns() - start_ns
+
+def create_probe_pool(read_timeout, size, overflow):
+    return QueuePool(
+        lambda: create_probe_connection(read_timeout),
+        pool_size=size,
+        max_overflow=overflow,
+        timeout=args.connect_timeout, # Longest a worker waits for a free connection
+        recycle=300, # Reopen sessions every few minutes so they rebalance after a failover
+        reset_on_return=None # Sessions are autocommit, skip the ROLLBACK round trip on every check-in
+    )
+
+pool_size = args.pool_size or worker_count
+POOL = create_probe_pool(args.connect_timeout, pool_size, args.pool_overflow)
+# Long queries get their own sessions whose reads outlast the SLEEP, so the short bound above holds for
+# every other probe. The C extension cannot change read_timeout on an open connection, so it is set per pool.
+# The long pool only keeps as many sessions open as long queries usually run at once; bursts above that
+# use overflow sessions closed on check-in, up to the same limit as the probe pool
+long_time = args.long_query_chance * args.long_query_duration
+short_time = (1 - args.long_query_chance) * args.short_query_interval
+long_share = long_time / (long_time + short_time) if long_time > 0 else 0 # Share of a worker's time spent in long queries
+long_pool_size = min(pool_size, max(1, math.ceil(worker_count * long_share)))
+LONG_POOL = create_probe_pool(args.long_query_duration + args.connect_timeout, long_pool_size, pool_size - long_pool_size + args.pool_overflow)
+
+# --- Batched short probe: one multi-statement round trip carrying several SELECT 1 ---
+SHORT_QUERY_BATCH_SQL = ";".join(["SELECT 1"] * args.short_query_batch)
+
+# --- Error codes that indicate the connection was lost ---
+CONNECTION_LOST_ERRNOS = frozenset({
+    mysql.connector.errorcode.CR_SERVER_GONE_ERROR,
+    mysql.connector.errorcode.CR_SERVER_LOST,
+    mysql.connector.errorcode.CR_SERVER_LOST_EXTENDED,
+    mysql.connector.errorcode.CR_CONNECTION_ERROR,
+    mysql.connector.errorcode.ER_CON_COUNT_ERROR,
+    mysql.connector.errorcode.ER_IPSOCK_ERROR,
+    mysql.connector.errorcode.ER_LOCK_WAIT_TIMEOUT, # Might indicate node issues
+    mysql.connector.errorcode.ER_QUERY_INTERRUPTED, # Can happen during failover
+    mysql.connector.errorcode.ER_QUERY_TIMEOUT, # Socket read/write timeout, the connector closes the connection
+})
+
+# --- Reconnect backoff bounds (seconds) ---
+RETRY_DELAY_BASE = 1
+RETRY_DELAY_CAP = 30
+
+# --- Pre-drawn worker actions: plan length and how often (seconds) it is redrawn ---
+ACTION_PLAN_SIZE = 4096
+ACTION_PLAN_REFRESH = 300
 
 # --- Global Flag for stopping threads ---
 stop_event = threading.Event()
 
+# --- Connection IDs of in-flight long queries, keyed by worker ID ---
+long_queries_lock = threading.Lock()
+long_queries = {}
+
 # --- Shared Stats ---
 stats_lock = threading.Lock()
 stats = {
@@ -90,29 +216,39 @@ stats = {
     'total_latency': 0.0,
     'reconnections': 0,
     'connection_failures': 0,
+    'checkouts': 0,
+    'total_checkout_wait': 0.0,
+    'pool_timeouts': 0,
     'errors': Counter()
 }
 
-def update_stats(query_success=False, is_write=False, latency=0.0, reconn=False, conn_fail=False, error_code=None):
+def update_stats(query_success=False, is_write=False, latency=0.0, reconn=False, conn_fail=False, error_code=None, queries=1):
     with stats_lock:
         if reconn:
             stats['reconnections'] += 1
         elif conn_fail:
             stats['connection_failures'] += 1
         else:
-            stats['total_queries'] += 1
+            stats['total_queries'] += queries
             if query_success:
-                stats['successful_queries'] += 1
+                stats['successful_queries'] += queries
                 if is_write:
                     stats['successful_writes'] += 1
-                stats['total_latency'] += latency
+                stats['total_latency'] += latency * queries # Every probe in a batch observed the round trip
             else:
-                stats['failed_queries'] += 1
+                stats['failed_queries'] += queries
                 if is_write:
                     stats['failed_writes'] += 1
         if error_code:
             stats['errors'][error_code] += 1
 
+def record_checkout_wait(wait, timed_out=False):
+    with stats_lock:
+        stats['checkouts'] += 1
+        stats['total_checkout_wait'] += wait
+        if timed_out:
+            stats['pool_timeouts'] += 1
+
 def log_stats_summary():
     with stats_lock:
         total = stats['total_queries']
@@ -120,36 +256,119 @@ def log_stats_summary():
         failed = stats['failed_queries']
         avg_latency = stats['total_latency'] / success if success > 0 else 0
         
-        logging.info("--- HA Probe Statistics Summary ---")
-        logging.info(f"Queries: Total: {total} | Success: {success} | Failed: {failed}")
+        log.info("--- HA Probe Statistics Summary ---")
+        log.info("Queries: Total: %s | Success: %s | Failed: %s", total, success, failed)
         if stats['successful_writes'] > 0 or stats['failed_writes'] > 0:
-            logging.info(f"Writes: Success: {stats['successful_writes']} | Failed: {stats['failed_writes']}")
-        logging.info(f"Avg Success Latency: {avg_latency:.4f}s")
-        logging.info(f"Connections: Reconnected: {stats['reconnections']} | Failures: {stats['connection_failures']}")
+            log.info("Writes: Success: %s | Failed: %s", stats['successful_writes'], stats['failed_writes'])
+        log.info("Avg Success Latency: %.4fs", avg_latency)
+        log.info("Connections: Reconnected: %s | Failures: %s", stats['reconnections'], stats['connection_failures'])
+        avg_checkout_wait = stats['total_checkout_wait'] / stats['checkouts'] if stats['checkouts'] > 0 else 0
+        log.info("Pools: Avg Checkout Wait (excl. connect): %.4fs | Timeouts: %s", avg_checkout_wait, stats['pool_timeouts'])
+        log.info("Probe Pool: %s", POOL.status())
+        log.info("Long Query Pool: %s", LONG_POOL.status())
         if stats['errors']:
-            logging.info(f"Top Errors: {stats['errors'].most_common(3)}")
-        logging.info("-----------------------------------")
+            log.info("Top Errors: %s", stats['errors'].most_common(3))
+        log.info("-----------------------------------")
 
 def ensure_test_table(connection):
     """Creates a simple table for write tests if it doesn't exist."""
     try:
-        cursor = connection.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ha_test_data (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                worker_id INT,
-                val VARCHAR(255),
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-        """)
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ha_test_data (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    worker_id INT,
+                    val VARCHAR(255),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
         connection.commit()
-        cursor.close()
     except mysql.connector.Error as err:
-        logging.error(f"Failed to ensure test table: {err}")
+        log.error("Failed to ensure test table: %s", err)
+
+def get_session_cursors(connection):
+    """
+    Returns the probe cursors cached on the pooled session, creating them for a new session.
+    Cursors are reused for every query on the session; the prepared ones keep their statements
+    prepared across check-ins. The pool clears the cache when it invalidates or recycles the session.
+    """
+    cursors = connection.info.get('probe_cursors')
+    if cursors is None:
+        cursors = {
+            'short': connection.cursor(prepared=True),
+            'long': connection.cursor(prepared=True),
+            'text': connection.cursor(buffered=False),
+        }
+        connection.info['probe_cursors'] = cursors
+    return cursors
+
+def drop_session_cursors(connection):
+    """Closes and forgets the probe cursors cached on the pooled session."""
+    cursors = connection.info.pop('probe_cursors', None)
+    if cursors is None:
+        return
+    for name in ('short', 'long', 'text'):
+        try:
+            cursors[name].close()
+        except Exception:
+            pass # The session is often already gone when this is called
+
+def next_retry_delay(rng, previous_delay):
+    """
+    Decorrelated jitter backoff: the next delay is drawn from [base, 3 * previous delay] and capped,
+    so workers that lost their connections together do not retry in lockstep.
+    """
+    return min(RETRY_DELAY_CAP, rng.uniform(RETRY_DELAY_BASE, previous_delay * 3))
+
+def kill_long_queries():
+    """Interrupts in-flight long queries so shutdown does not wait for their SLEEP to finish."""
+    with long_queries_lock:
+        connection_ids = list(long_queries.values())
+    if not connection_ids:
+        return
+
+    log.info("Killing %s in-flight long queries...", len(connection_ids))
+    admin_connection = None
+    try:
+        admin_connection = mysql.connector.connect(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            connection_timeout=args.connect_timeout
+        )
+        with admin_connection.cursor() as cursor:
+            for connection_id in connection_ids:
+                try:
+                    cursor.execute(f"KILL QUERY {int(connection_id)}")
+                except mysql.connector.Error as err:
+                    log.warning("Failed to kill query on connection %s: %s", connection_id, err)
+    except mysql.connector.Error as err:
+        log.error("Failed to kill in-flight long queries: %s", err)
+    finally:
+        if admin_connection:
+            admin_connection.close()
+
+def build_action_plan(rng):
+    """
+    Pre-draws (query type, pause) pairs for a worker so the hot loop does not call the RNG per probe.
+    The plan is much longer than the loop period, so the query mix and jitter keep their distribution.
+    """
+    plan = []
+    for _ in range(ACTION_PLAN_SIZE):
+        rand = rng.random()
+        if rand < args.long_query_chance:
+            query_type = 'long'
+        elif rand < (args.long_query_chance + args.write_ratio):
+            query_type = 'write'
+        else:
+            query_type = 'short'
+        plan.append((query_type, args.short_query_interval * (0.8 + rng.random() * 0.4))) # Add some jitter
+    return plan
 
 # --- Signal Handler for graceful shutdown ---
 def signal_handler(sig, frame):
-    logging.info('Stop signal received, shutting down workers...')
+    log.info('Stop signal received, shutting down workers...')
     stop_event.set()
 
 signal.signal(signal.SIGINT, signal_handler)  # Handle Ctrl+C
@@ -159,75 +378,83 @@ signal.signal(signal.SIGTERM, signal_handler) # Handle termination signals
 def db_worker(worker_id):
     """
     Represents a single application "user" connecting to the database.
-    Establishes a connection, performs queries, and handles errors/reconnects.
+    Checks a connection out of the pool for each query cycle, performs queries, and handles errors/reconnects.
     """
-    thread_name = threading.current_thread().name
-    logging.info(f"Starting worker {worker_id}")
-    connection = None
-    retry_delay = 1 # Initial reconnect delay
+    threading.current_thread().name = f"Worker-{worker_id}" # Executor threads are reused, name them after the worker they run
+    log.info("Starting worker %s", worker_id)
+    retry_delay = RETRY_DELAY_BASE # Previous reconnect delay, grows with jittered backoff
+    rng = random.Random(os.urandom(16)) # Per-worker generator: no shared RNG lock, retries spread out across workers
     last_error_time = None # Track the timestamp of the last connection error
+    # Bind the settings used in the loop as locals (LOAD_FAST instead of a global + attribute lookup)
+    _long_dur = args.long_query_duration
+    _write_ratio = args.write_ratio
+    _batch = args.short_query_batch
+    _stop_is_set = stop_event.is_set # Event.is_set just returns the flag, no lock is taken
+    actions = itertools.cycle(build_action_plan(rng))
+    plan_built_at = time.monotonic()
+
+    while not _stop_is_set():
+        connection = None
+        is_write = False
+        probes = 1 # Number of probes covered by this cycle
+        pause = 0 # Seconds to wait after the connection has been returned to the pool
+        if time.monotonic() - plan_built_at > ACTION_PLAN_REFRESH:
+            # Redraw the plan now and then so the probe pattern is not perfectly periodic
+            actions = itertools.cycle(build_action_plan(rng))
+            plan_built_at = time.monotonic()
+        query_type, sleep_for = next(actions)
 
-    while not stop_event.is_set():
         try:
-            # --- Establish Connection (if needed) ---
-            if connection is None or not connection.is_connected():
-                logging.info("Attempting to connect...")
-                try:
-                    connection = mysql.connector.connect(
-                        host=args.host,
-                        port=args.port,
-                        user=args.user,
-                        password=args.password,
-                        database=args.database,
-                        connection_timeout=args.connect_timeout,
-                        autocommit=True
-                    )
-                    current_time = time.time()
-                    if last_error_time is not None:
-                        downtime = current_time - last_error_time
-                        logging.info(f"Connection recovered after {downtime:.2f} seconds of downtime. Connection ID: {connection.connection_id}")
-                        last_error_time = None  # Reset the error timestamp
-                    else:
-                        logging.info(f"Connection established successfully. Connection ID: {connection.connection_id}")
-                    
-                    if args.write_ratio > 0:
-                        ensure_test_table(connection)
-
-                    retry_delay = 1 # Reset retry delay on successful connection
-                    update_stats(reconn=True)
-                except mysql.connector.Error as err:
-                    logging.error(f"Connection failed: {err}. Retrying in {retry_delay}s...")
-                    update_stats(conn_fail=True, error_code=err.errno)
-                    if last_error_time is None:
-                        last_error_time = time.time()  # Record the time of the first error
-                    connection = None # Ensure connection is None if connect fails
-                    time.sleep(retry_delay)
-                    retry_delay = min(retry_delay * 2, 30) # Exponential backoff up to 30s
-                    continue # Skip to next loop iteration to retry connection
+            # --- Acquire Connection from Pool (re-established by the pool if needed) ---
+            connect_timing.ns = 0
+            checkout_start_ns = perf_counter_ns()
+            try:
+                connection = (LONG_POOL if query_type == 'long' else POOL).connect()
+            except PoolTimeoutError:
+                # Every pooled connection is busy: the probe is overloaded, the database is not down
+                record_checkout_wait((perf_counter_ns() - checkout_start_ns) / 1e9, timed_out=True)
+                log.warning("No pooled connection became free within %ss, retrying...", args.connect_timeout)
+                continue
+            except mysql.connector.Error as err:
+                retry_delay = next_retry_delay(rng, retry_delay)
+                log.error("Connection failed: %s. Retrying in %.2fs...", err, retry_delay)
+                update_stats(conn_fail=True, error_code=err.errno)
+                if last_error_time is None:
+                    last_error_time = time.monotonic()  # Record the time of the first error
+                stop_event.wait(retry_delay) # Returns early on shutdown
+                continue # Skip to next loop iteration to retry connection
+            record_checkout_wait((perf_counter_ns() - checkout_start_ns - connect_timing.ns) / 1e9)
 
             # --- Perform Queries ---
-            cursor = None # Define cursor outside try block for finally clause
-            is_write = False
             try:
-                cursor = connection.cursor()
+                cursors = get_session_cursors(connection)
 
-                # Decide query type
-                rand = random.random()
-                if rand < args.long_query_chance:
+                if query_type == 'long':
                     # Long Query Simulation (using SLEEP)
-                    query = f"SELECT SLEEP({args.long_query_duration})"
-                    start_time = time.time()
-                    logging.info(f"Executing long query: {query}")
-                    cursor.execute(query)
-                    cursor.fetchone()
-                    duration = time.time() - start_time
-                    logging.info(f"Long query completed in {duration:.2f}s")
+                    # Check for shutdown under the lock kill_long_queries snapshots with, so a long
+                    # query is either seen and killed by shutdown or never started
+                    with long_queries_lock:
+                        if _stop_is_set():
+                            continue # The finally block returns the connection; the loop then exits
+                        long_queries[worker_id] = connection.connection_id # Lets shutdown KILL it
+                    query = "SELECT SLEEP(%s)"
+                    start_ns = perf_counter_ns()
+                    log.info("Executing long query: SELECT SLEEP(%s)", _long_dur)
+                    try:
+                        cursors['long'].execute(query, (_long_dur,))
+                        cursors['long'].fetchall()
+                    finally:
+                        with long_queries_lock:
+                            long_queries.pop(worker_id, None)
+                    duration = (perf_counter_ns() - start_ns) / 1e9
+                    log.info("Long query completed in %.2fs", duration)
                     update_stats(query_success=True, latency=duration)
-                elif rand < (args.long_query_chance + args.write_ratio):
+                elif query_type == 'write':
                     # Write Query Simulation
                     is_write = True
-                    start_time = time.time()
-                    write_type = random.choice(['INSERT', 'UPDATE', 'DELETE'])
+                    cursor = cursors['text']
+                    start_ns = perf_counter_ns()
+                    write_type = rng.choice(['INSERT', 'UPDATE', 'DELETE'])
                     if write_type == 'INSERT':
                         query = "INSERT INTO ha_test_data (worker_id, val) VALUES (%s, %s)"
                         cursor.execute(query, (worker_id, f"worker-{worker_id}-at-{time.time()}"))
@@ -238,134 +465,157 @@ def db_worker(worker_id):
                         query = "DELETE FROM ha_test_data WHERE worker_id = %s LIMIT 1"
                         cursor.execute(query, (worker_id,))
                     
-                    duration = time.time() - start_time
-                    logging.debug(f"Write query ({write_type}) completed in {duration:.4f}s")
+                    duration = (perf_counter_ns() - start_ns) / 1e9
+                    log.debug("Write query (%s) completed in %.4fs", write_type, duration)
                     update_stats(query_success=True, is_write=True, latency=duration)
+                elif _batch > 1:
+                    # Batched Short Query Simulation (several probes share one round trip)
+                    probes = _batch
+                    start_ns = perf_counter_ns()
+                    cursors['text'].execute(SHORT_QUERY_BATCH_SQL)
+                    for _statement, _rows in cursors['text'].fetchsets():
+                        pass
+                    duration = (perf_counter_ns() - start_ns) / 1e9
+                    update_stats(query_success=True, latency=duration, queries=probes)
                 else:
                     # Short Query Simulation
                     query = "SELECT 1" # A very lightweight query
-                    start_time = time.time()
-                    cursor.execute(query)
-                    cursor.fetchone()
-                    duration = time.time() - start_time
+                    start_ns = perf_counter_ns()
+                    cursors['short'].execute(query)
+                    cursors['short'].fetchall()
+                    duration = (perf_counter_ns() - start_ns) / 1e9
                     update_stats(query_success=True, latency=duration)
 
-                cursor.close() # Close cursor promptly
-                cursor = None # Mark as closed
+                # A checkout alone does not prove recovery: pooled sessions are not pinged, so an idle one
+                # may be stale. Only the first query that succeeds after an error ends the outage
+                if last_error_time is not None:
+                    downtime = time.monotonic() - last_error_time
+                    log.info("Connection recovered after %.2f seconds of downtime. Connection ID: %s", downtime, connection.connection_id)
+                    last_error_time = None  # Reset the error timestamp
+
+                    if _write_ratio > 0:
+                        ensure_test_table(connection)
+
+                    update_stats(reconn=True)
+                    retry_delay = RETRY_DELAY_BASE # Reset retry delay once the database answers again
 
                 # Wait before next query
-                time.sleep(args.short_query_interval * (0.8 + random.random() * 0.4)) # Add some jitter
+                pause = sleep_for * probes
 
             except mysql.connector.Error as err:
-                logging.error(f"Query failed: {err}")
-                update_stats(query_success=False, is_write=is_write, error_code=err.errno)
+                log.error("Query failed: %s", err)
+                update_stats(query_success=False, is_write=is_write, error_code=err.errno, queries=probes)
+                drop_session_cursors(connection) # Statements may be gone or the cursors left mid-result
                 # Check for specific errors that indicate connection loss
-                if err.errno in (mysql.connector.errorcode.CR_SERVER_GONE_ERROR,
-                                 mysql.connector.errorcode.CR_SERVER_LOST,
-                                 mysql.connector.errorcode.CR_CONNECTION_ERROR,
-                                 mysql.connector.errorcode.ER_CON_COUNT_ERROR,
-                                 mysql.connector.errorcode.ER_IPSOCK_ERROR,
-                                 mysql.connector.errorcode.ER_LOCK_WAIT_TIMEOUT, # Might indicate node issues
-                                 mysql.connector.errorcode.ER_QUERY_INTERRUPTED): # Can happen during failover
-                    logging.warning("Connection likely lost, attempting reconnect on next cycle.")
+                if err.errno in CONNECTION_LOST_ERRNOS:
+                    log.warning("Connection likely lost, attempting reconnect on next cycle.")
                     if last_error_time is None:
-                        last_error_time = time.time()  # Record the time of the first connection loss
-                    if connection and connection.is_connected():
-                        try:
-                            connection.close() # Attempt to close the faulty connection
-                        except Exception as close_err:
-                            logging.error(f"Error closing faulty connection: {close_err}")
-                    connection = None # Force reconnect attempt in the next loop
-                    time.sleep(1) # Brief pause before trying to reconnect
+                        last_error_time = time.monotonic()  # Record the time of the first connection loss
+                    try:
+                        connection.invalidate() # Drop the faulty session; the pool opens a new one on a later checkout
+                    except Exception as close_err:
+                        log.error("Error closing faulty connection: %s", close_err)
+                    retry_delay = next_retry_delay(rng, retry_delay)
+                    pause = retry_delay # Jittered pause before trying to reconnect
                 else:
                      # Other errors might be query syntax, permissions etc. - log and continue
-                     time.sleep(2) # Pause slightly after other errors
-
-            finally:
-                # Ensure cursor is closed if it was opened and an error occurred before explicit close
-                if cursor is not None:
-                    try:
-                        cursor.close()
-                    except Exception as cur_close_err:
-                         logging.error(f"Error closing cursor in finally block: {cur_close_err}")
-
+                     pause = 2 # Pause slightly after other errors
 
         except Exception as e:
             # Catch unexpected errors in the main loop
-            logging.critical(f"Unexpected critical error in worker loop: {e}", exc_info=True)
+            log.critical("Unexpected critical error in worker loop: %s", e, exc_info=True)
             update_stats(query_success=False, is_write=is_write, error_code="CRITICAL")
             if last_error_time is None:
-                last_error_time = time.time()  # Record the time of the first critical error
-            if connection and connection.is_connected():
+                last_error_time = time.monotonic()  # Record the time of the first critical error
+            if connection is not None:
+                drop_session_cursors(connection)
+                try:
+                    connection.invalidate() # Force the pool to reconnect it
+                except Exception as close_err:
+                     log.error("Error closing connection after critical error: %s", close_err)
+            pause = 5 # Wait longer after critical errors
+
+        finally:
+            # Return the connection to the pool before pausing so it can be reused
+            if connection is not None:
                 try:
                     connection.close()
                 except Exception as close_err:
-                     logging.error(f"Error closing connection after critical error: {close_err}")
-            connection = None # Force reconnect
-            time.sleep(5) # Wait longer after critical errors
+                    log.error("Error returning connection to pool: %s", close_err)
 
-    # --- Cleanup on exit ---
-    if connection and connection.is_connected():
-        logging.info("Closing connection...")
-        try:
-            connection.close()
-        except Exception as close_err:
-            logging.error(f"Error closing connection during shutdown: {close_err}")
-    logging.info(f"Worker {worker_id} stopped.")
+        if stop_event.wait(pause): # Returns immediately on shutdown instead of sleeping it out
+            break
+
+    log.info("Worker %s stopped.", worker_id)
 
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    logging.info(f"Starting MySQL HA Test Client with {args.workers} workers.")
-    logging.info(f"Target: mysql://{args.user}:***@{args.host}:{args.port}/{args.database}")
-    logging.info(f"Short query interval: {args.short_query_interval}s")
-    logging.info(f"Long query chance: {args.long_query_chance * 100}%")
-    logging.info(f"Long query duration: {args.long_query_duration}s")
-    logging.info(f"Write ratio: {args.write_ratio * 100}%")
-    logging.info(f"Report interval: {args.report_interval}s")
-
-    threads = []
-    for i in range(args.workers):
-        thread = threading.Thread(target=db_worker, args=(i+1,), name=f"Worker-{i+1}", daemon=True)
-        threads.append(thread)
-        thread.start()
-        time.sleep(0.1) # Stagger thread starts slightly
-
-    logging.info(f"All {args.workers} workers started. Running until Ctrl+C is pressed.")
+    log.info("Starting MySQL HA Test Client with %s workers.", worker_count)
+    log.info("Target: mysql://%s:***@%s:%s/%s", args.user, args.host, args.port, args.database)
+    log.info("Short query interval: %ss", args.short_query_interval)
+    log.info("Short query batch: %s", args.short_query_batch)
+    log.info("Long query chance: %s%%", args.long_query_chance * 100)
+    log.info("Long query duration: %ss", args.long_query_duration)
+    log.info("Write ratio: %s%%", args.write_ratio * 100)
+    log.info("Report interval: %ss", args.report_interval)
+    log.info("Connection pool size: %s (overflow: %s), long query pool size: %s", pool_size, args.pool_overflow, long_pool_size)
+    if mysql.connector.HAVE_CEXT:
+        log.info("MySQL driver: mysql-connector-python C extension")
+    else:
+        log.warning("MySQL driver: C extension not available, falling back to the pure Python protocol (higher CPU per query)")
+
+    if args.write_ratio > 0:
+        try:
+            connection = POOL.connect()
+        except mysql.connector.Error as err:
+            log.error("Failed to connect: %s", err)
+            sys.exit(1)
+        try:
+            ensure_test_table(connection)
+        finally:
+            connection.close()
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="Worker")
+    futures = [executor.submit(db_worker, i+1) for i in range(worker_count)]
+
+    log.info("All %s workers started. Running until Ctrl+C is pressed.", worker_count)
 
     # Keep the main thread alive while workers run, waiting for the stop event
     try:
-        last_report_time = time.time()
+        last_report_time = time.monotonic()
         while not stop_event.is_set():
             # Check worker health
-            for i, t in enumerate(threads):
-                if not t.is_alive() and not stop_event.is_set():
-                    logging.warning(f"Worker-{i+1} seems to have died unexpectedly. Restarting...")
-                    new_thread = threading.Thread(target=db_worker, args=(i+1,), name=f"Worker-{i+1}", daemon=True)
-                    threads[i] = new_thread
-                    new_thread.start()
+            for i, future in enumerate(futures):
+                if future.done() and not stop_event.is_set():
+                    log.warning("Worker-%s seems to have died unexpectedly (%s). Restarting...", i+1, future.exception())
+                    futures[i] = executor.submit(db_worker, i+1)
 
             # Periodic Stats Reporting
-            if args.report_interval > 0 and time.time() - last_report_time > args.report_interval:
+            if args.report_interval > 0 and time.monotonic() - last_report_time > args.report_interval:
                 log_stats_summary()
-                last_report_time = time.time()
+                last_report_time = time.monotonic()
 
-            time.sleep(1) # Main thread sleep interval
+            stop_event.wait(1) # Main thread check interval, cut short by a stop signal
 
     except KeyboardInterrupt:
-        logging.info("KeyboardInterrupt received in main thread, signaling workers to stop...")
+        log.info("KeyboardInterrupt received in main thread, signaling workers to stop...")
         stop_event.set()
 
     # Final report
-    logging.info("Exiting... Final summary:")
+    log.info("Exiting... Final summary:")
     log_stats_summary()
 
-    # Wait for all threads to finish
-    logging.info("Waiting for worker threads to complete...")
-    for thread in threads:
-        thread.join(timeout=args.long_query_duration + 5) # Wait a bit longer than longest query + buffer
-        if thread.is_alive():
-             logging.warning(f"Thread {thread.name} did not exit cleanly after timeout.")
+    # Don't let a long --long-query-duration hold up shutdown
+    kill_long_queries()
 
-    logging.info("MySQL HA Test Client finished.")
+    # Wait for all threads to finish
+    log.info("Waiting for worker threads to complete...")
+    # In-flight long queries have been killed, workers only need to notice
+    _, not_done = concurrent.futures.wait(futures, timeout=5)
+    if not_done:
+        log.warning("%s workers did not exit cleanly after timeout, waiting for their queries to time out.", len(not_done))
+    executor.shutdown(wait=True)
+
+    log.info("MySQL HA Test Client finished.")
     sys.exit(0)